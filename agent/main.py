@@ -1,10 +1,16 @@
 import os
 import time
+import heapq
+import threading
 import psutil
 import platform
 import socket
-import datetime
-from fastapi import FastAPI
+try:
+    import pwd
+except ImportError:
+    pwd = None  # Windows 等非 POSIX 平台
+from fastapi import FastAPI, Response
+from fastapi.concurrency import run_in_threadpool
 from fastapi.middleware.cors import CORSMiddleware
 import uvicorn
 from pydantic import BaseModel
@@ -32,6 +38,8 @@ app.add_middleware(
 
 # --- Data Models (Pydantic) ---
 
+# 所有字段都由本进程自己生成, 无需 Pydantic 校验:
+# 构造一律用 model_construct, 响应直接发采样线程预序列化的字节
 class ProcessInfo(BaseModel):
     pid: int
     user: str
@@ -40,6 +48,7 @@ class ProcessInfo(BaseModel):
     memory_percent: float
     gpu_index: Optional[int] = None
     vram_used_mb: Optional[int] = None
+    gpu_utilization: Optional[int] = None  # 新增: 该进程的 SM 占用 %
 
 class GpuInfo(BaseModel):
     id: int
@@ -69,6 +78,33 @@ class SystemMetrics(BaseModel):
     gpus: List[GpuInfo]
     processes: List[ProcessInfo] # 新增: 关键进程列表
 
+# --- GPU 句柄缓存 (进程生命周期内不变, 避免每次请求重复解析) ---
+GPU_HANDLES = []  # [(index, handle, name)]
+
+def _init_gpu_handles():
+    """枚举设备并缓存句柄和名称, 省去每次 /metrics 的重复 NVML 调用"""
+    global GPU_HANDLES
+    handles = []
+    try:
+        for i in range(pynvml.nvmlDeviceGetCount()):
+            handle = pynvml.nvmlDeviceGetHandleByIndex(i)
+            name = pynvml.nvmlDeviceGetName(handle)
+            if isinstance(name, bytes):
+                name = name.decode("utf-8")
+            handles.append((i, handle, name))
+    except Exception as e:
+        print(f"Error caching GPU handles: {e}")
+    GPU_HANDLES = handles
+
+def _nvml_error_is_fatal(err) -> bool:
+    """句柄失效类错误 (驱动重载/NVML 未初始化等), 这类错误需要重建句柄缓存"""
+    return getattr(err, "value", None) in (
+        pynvml.NVML_ERROR_UNINITIALIZED,
+        pynvml.NVML_ERROR_INVALID_ARGUMENT,
+        pynvml.NVML_ERROR_DRIVER_NOT_LOADED,
+        pynvml.NVML_ERROR_GPU_IS_LOST,
+    )
+
 # --- Helper Functions ---
 
 def get_ip_address():
@@ -82,12 +118,28 @@ def get_ip_address():
     except Exception:
         return "127.0.0.1"
 
+# IP 地址缓存 (60 秒 TTL): 链路变化极少, 没必要每次采样都开 UDP socket
+# ts 初始为 None: monotonic 是开机起算的秒数, 开机后 60 秒内启动时 0.0 会被当成"新鲜"
+_IP_CACHE = {"ts": None, "ip": "127.0.0.1"}
+_IP_LOCK = threading.Lock()
+
+def _get_ip_cached():
+    now = time.monotonic()
+    if _IP_CACHE["ts"] is not None and now - _IP_CACHE["ts"] < 60:
+        return _IP_CACHE["ip"]
+    with _IP_LOCK:
+        if _IP_CACHE["ts"] is not None and now - _IP_CACHE["ts"] < 60:  # 双重检查, 避免并发重复探测
+            return _IP_CACHE["ip"]
+        ip = get_ip_address()
+        _IP_CACHE["ip"] = ip
+        _IP_CACHE["ts"] = now
+    return ip
+
 def format_uptime(seconds: float) -> str:
-    """将秒数转换为易读格式"""
-    td = datetime.timedelta(seconds=seconds)
-    days = td.days
-    hours = td.seconds // 3600
-    minutes = (td.seconds // 60) % 60
+    """将秒数转换为易读格式 (纯整数运算, 不分配 timedelta)"""
+    days, rem = divmod(int(seconds), 86400)
+    hours, rem = divmod(rem, 3600)
+    minutes = rem // 60
     if days > 0:
         return f"{days}d {hours}h {minutes}m"
     return f"{hours}h {minutes}m"
@@ -96,173 +148,392 @@ def get_cpu_model():
     try:
         if platform.system() == "Linux":
             # 尝试从 /proc/cpuinfo 获取更准确的型号
-            with open("/proc/cpuinfo") as f:
-                for line in f:
-                    if "model name" in line:
-                        return line.split(":")[1].strip()
+            # 第一个 processor 块就含 model name: 一次 read + C 层 find, 不逐行迭代
+            with open("/proc/cpuinfo", "rb") as f:
+                data = f.read(4096)
+            i = data.find(b"model name")
+            if i != -1:
+                j = data.find(b":", i)
+                k = data.find(b"\n", j)
+                return data[j + 1:k].strip().decode()
         return platform.processor()
     except:
         return "Unknown CPU"
 
+# --- 静态系统信息 (进程生命周期内不变, 启动时计算一次) ---
+HOSTNAME = platform.node()
+OS_STRING = f"{platform.system()} {platform.release()}"
+CPU_MODEL = get_cpu_model()
+CPU_CORES = psutil.cpu_count(logical=True)
+
 # --- API Endpoints ---
 
 @app.on_event("startup")
 async def startup_event():
     if HAS_GPU:
+        _init_gpu_handles()
         print("✅ NVIDIA Driver detected and NVML initialized.")
     else:
         print("⚠️ No NVIDIA GPU detected or NVML failed. Running in CPU-only mode.")
+    threading.Thread(target=_sampler_loop, daemon=True).start()
+    print(f"📊 Background sampler started (interval: {POLL_INTERVAL}s)")
 
 @app.get("/")
 def read_root():
     return {"status": "Nexus Agent is running", "version": "0.2.0 (Enhanced)"}
 
-@app.get("/metrics", response_model=SystemMetrics)
-def get_metrics():
-    # 1. System Basic Info
-    boot_time = psutil.boot_time()
-    uptime_sec = time.time() - boot_time
-    
-    # 2. CPU & RAM
-    cpu_percent = psutil.cpu_percent(interval=None) # 非阻塞
-    cpu_cores = psutil.cpu_count(logical=True)
-    mem = psutil.virtual_memory()
-    
-    # 3. Network
-    net = psutil.net_io_counters()
-    
-    # 4. GPU Info & Process Mapping
+# GPU 温度/风扇/功率在驱动内部约 20~100ms 才刷新一次, 采得更快也只是旧值
+# 所以 GPU 遥测用比 CPU/RAM 更慢的节奏, 间隔内直接复用上次结果
+GPU_POLL_INTERVAL = float(os.getenv("GPU_POLL_INTERVAL_SECONDS", "3"))
+# ts 初始为 None: 同 _IP_CACHE, 避免开机后立即启动时空缓存被当成"新鲜"
+_GPU_CACHE = {"ts": None, "gpus": [], "proc_map": {}}
+
+# 每个字段都是一次独立的驱动往返, 不需要的就别查
+# (例如数据中心卡风扇永远返回 0, 可用 NVML_FIELDS=util,temp,mem,power 关掉)
+NVML_FIELDS = set(os.getenv("NVML_FIELDS", "util,temp,mem,power,fan").split(","))
+
+# 每设备上次采样的时间戳, 让 nvmlDeviceGetProcessUtilization 只返回增量
+LAST_SEEN_TS = {}  # device_idx -> timestamp (us)
+
+def _collect_gpus():
+    """采集 GPU 指标与进程映射, GPU_POLL_INTERVAL 秒内返回缓存结果"""
+    now = time.monotonic()
+    if _GPU_CACHE["ts"] is not None and now - _GPU_CACHE["ts"] < GPU_POLL_INTERVAL:
+        return _GPU_CACHE["gpus"], _GPU_CACHE["proc_map"]
+
+    # 启动时枚举失败 (或驱动重载后被清空) 的句柄缓存在此自愈
+    if not GPU_HANDLES:
+        _init_gpu_handles()
+
     gpu_list = []
     gpu_processes_map = {} # PID -> {gpuIdx, vram}
-    
-    if HAS_GPU:
-        try:
-            device_count = pynvml.nvmlDeviceGetCount()
-            for i in range(device_count):
-                handle = pynvml.nvmlDeviceGetHandleByIndex(i)
-                name = pynvml.nvmlDeviceGetName(handle)
-                if isinstance(name, bytes):
-                    name = name.decode("utf-8")
-                
-                # Utilization
+    try:
+        for i, handle, name in GPU_HANDLES:
+            # 单字段失败容忍 (如不支持风扇转速), 但句柄失效必须上抛触发重建
+            # Utilization
+            util = 0
+            if "util" in NVML_FIELDS:
                 try:
                     util = pynvml.nvmlDeviceGetUtilizationRates(handle).gpu
-                except: util = 0
-                
-                # Temperature
+                except pynvml.NVMLError as e:
+                    if _nvml_error_is_fatal(e):
+                        raise
+
+            # Temperature
+            temp = 0
+            if "temp" in NVML_FIELDS:
                 try:
                     temp = pynvml.nvmlDeviceGetTemperature(handle, pynvml.NVML_TEMPERATURE_GPU)
-                except: temp = 0
+                except pynvml.NVMLError as e:
+                    if _nvml_error_is_fatal(e):
+                        raise
 
-                # Fan Speed
+            # Fan Speed
+            fan = 0
+            if "fan" in NVML_FIELDS:
                 try:
                     fan = pynvml.nvmlDeviceGetFanSpeed(handle)
-                except: fan = 0
+                except pynvml.NVMLError as e:
+                    if _nvml_error_is_fatal(e):
+                        raise
 
-                # Power Usage (mW -> W)
+            # Power Usage (mW -> W)
+            power_w = 0
+            if "power" in NVML_FIELDS:
                 try:
-                    power_mw = pynvml.nvmlDeviceGetPowerUsage(handle)
-                    power_w = int(power_mw / 1000)
-                except: power_w = 0
+                    power_w = int(pynvml.nvmlDeviceGetPowerUsage(handle) / 1000)
+                except pynvml.NVMLError as e:
+                    if _nvml_error_is_fatal(e):
+                        raise
 
-                # Memory
+            # Memory
+            mem_total_gb = mem_used_gb = mem_util = 0.0
+            if "mem" in NVML_FIELDS:
                 mem_info = pynvml.nvmlDeviceGetMemoryInfo(handle)
+                mem_total_gb = round(mem_info.total / 1024**3, 1)
+                mem_used_gb = round(mem_info.used / 1024**3, 1)
+                mem_util = round((mem_info.used / mem_info.total) * 100, 1)
+
+            gpu_list.append(GpuInfo.model_construct(
+                id=i,
+                name=name,
+                temperature=temp,
+                fan_speed=fan,
+                power_draw=power_w,
+                utilization=util,
+                memory_total=mem_total_gb,
+                memory_used=mem_used_gb,
+                memory_utilization=mem_util
+            ))
+
+            # Mapping Processes on this GPU
+            try:
+                # Combine Compute and Graphics processes
+                procs = pynvml.nvmlDeviceGetComputeRunningProcesses(handle) + \
+                        pynvml.nvmlDeviceGetGraphicsRunningProcesses(handle)
                 
-                gpu_list.append(GpuInfo(
-                    id=i,
-                    name=name,
-                    temperature=temp,
-                    fan_speed=fan,
-                    power_draw=power_w,
-                    utilization=util,
-                    memory_total=round(mem_info.total / 1024**3, 1),
-                    memory_used=round(mem_info.used / 1024**3, 1),
-                    memory_utilization=round((mem_info.used / mem_info.total) * 100, 1)
-                ))
+                for p in procs:
+                    gpu_processes_map[p.pid] = {
+                        "gpu_idx": i,
+                        "vram_mb": int(p.usedGpuMemory / 1024 / 1024) if p.usedGpuMemory else 0
+                    }
+            except pynvml.NVMLError as e:
+                if _nvml_error_is_fatal(e):
+                    raise
+            except Exception:
+                pass
 
-                # Mapping Processes on this GPU
-                try:
-                    # Combine Compute and Graphics processes
-                    procs = pynvml.nvmlDeviceGetComputeRunningProcesses(handle) + \
-                            pynvml.nvmlDeviceGetGraphicsRunningProcesses(handle)
-                    
-                    for p in procs:
-                        gpu_processes_map[p.pid] = {
-                            "gpu_idx": i,
-                            "vram_mb": int(p.usedGpuMemory / 1024 / 1024) if p.usedGpuMemory else 0
-                        }
-                except Exception:
-                    pass
-                    
-        except Exception as e:
-            print(f"Error reading GPU stats: {e}")
+            # 每进程 SM 占用率: 带上次时间戳, 驱动只返回增量样本
+            # (不带时间戳会让驱动扫描整个历史窗口, 白白变慢)
+            try:
+                samples = pynvml.nvmlDeviceGetProcessUtilization(handle, LAST_SEEN_TS.get(i, 0))
+                if samples:
+                    LAST_SEEN_TS[i] = max(s.timeStamp for s in samples)
+                for s in samples:
+                    if s.pid in gpu_processes_map:
+                        gpu_processes_map[s.pid]["gpu_util"] = s.smUtil
+            except pynvml.NVMLError as e:
+                if _nvml_error_is_fatal(e):
+                    raise
+            except Exception:
+                pass
+
+    except Exception as e:
+        print(f"Error reading GPU stats: {e}")
+        # 句柄可能因驱动重载失效, 尝试重建缓存
+        _init_gpu_handles()
+
+    _GPU_CACHE["ts"] = now
+    _GPU_CACHE["gpus"] = gpu_list
+    _GPU_CACHE["proc_map"] = gpu_processes_map
+    return gpu_list, gpu_processes_map
+
+# --- 进程枚举 ---
+# Linux 上直接扫 /proc, 每个 PID 只读三个文件;
+# psutil.process_iter 会为系统里每个 PID 构造 Process 对象再被我们过滤掉 90%
+IS_LINUX = platform.system() == "Linux"
+_CLK_TCK = os.sysconf("SC_CLK_TCK") if IS_LINUX else 100
+_TOTAL_MEM = psutil.virtual_memory().total
+_PREV_CPU = {}   # pid -> (utime+stime ticks, monotonic_ts), 用于算 CPU%
+_UID_NAMES = {}  # uid -> username
+
+def _uid_to_name(uid):
+    name = _UID_NAMES.get(uid)
+    if name is None:
+        try:
+            name = pwd.getpwuid(uid).pw_name
+        except (KeyError, OSError, AttributeError):
+            name = str(uid)
+        _UID_NAMES[uid] = name
+    return name
+
+def _linux_fast_proc_iter():
+    """直接遍历 /proc 枚举进程, 产出与 psutil 路径同构的字典
+
+    CPU% 由相邻两次采样的 utime+stime tick 增量算出,
+    上次采样值存放在模块级 _PREV_CPU 中。
+    """
+    now = time.monotonic()
+    seen = set()
+    for entry in os.listdir("/proc"):
+        if not entry.isdigit():
+            continue
+        pid = int(entry)
+        try:
+            with open(f"/proc/{entry}/stat", "rb") as f:
+                stat = f.read()
+            # comm 可能含空格或括号, 从右侧定位右括号
+            rp = stat.rfind(b")")
+            name = stat[stat.find(b"(") + 1:rp].decode(errors="replace")
+            fields = stat[rp + 2:].split()
+            total_ticks = int(fields[11]) + int(fields[12])  # utime + stime
+
+            prev = _PREV_CPU.get(pid)
+            _PREV_CPU[pid] = (total_ticks, now)
+            seen.add(pid)
+            cpu = 0.0
+            if prev is not None and now > prev[1]:
+                cpu = (total_ticks - prev[0]) / _CLK_TCK / (now - prev[1]) * 100
+
+            rss_kb = 0
+            uid = 0
+            with open(f"/proc/{entry}/status", "rb") as f:
+                for line in f:
+                    if line.startswith(b"VmRSS:"):
+                        rss_kb = int(line.split()[1])
+                    elif line.startswith(b"Uid:"):
+                        uid = int(line.split()[1])
+
+            with open(f"/proc/{entry}/cmdline", "rb") as f:
+                cmdline = [c.decode(errors="replace") for c in f.read().split(b"\0") if c]
+
+            yield {
+                'pid': pid,
+                'name': name,
+                'username': _uid_to_name(uid),
+                'cmdline': cmdline,
+                'cpu_percent': round(cpu, 1),
+                'memory_percent': rss_kb * 1024 / _TOTAL_MEM * 100,
+            }
+        except (FileNotFoundError, ProcessLookupError, PermissionError, ValueError, IndexError):
+            # 进程中途退出/无权限, 跳过即可
+            continue
+    # 清掉已退出进程的记录, 防止 _PREV_CPU 无限膨胀
+    for pid in list(_PREV_CPU):
+        if pid not in seen:
+            del _PREV_CPU[pid]
+
+def _psutil_proc_iter():
+    """非 Linux 平台回退: 经由 psutil 枚举进程"""
+    for proc in psutil.process_iter():
+        try:
+            # oneshot() 把同一进程的多次字段读取合并成一组, 约快 2 倍
+            with proc.oneshot():
+                yield {
+                    'pid': proc.pid,
+                    'name': proc.name(),
+                    'username': proc.username(),
+                    'cmdline': proc.cmdline(),
+                    'cpu_percent': proc.cpu_percent(),
+                    'memory_percent': proc.memory_percent(),
+                }
+        except (psutil.NoSuchProcess, psutil.AccessDenied, psutil.ZombieProcess):
+            pass
+
+def _collect_sync() -> SystemMetrics:
+    """同步采集所有指标 (psutil + NVML 均为阻塞调用, 需在线程池执行)"""
+    # 1. System Basic Info
+    boot_time = psutil.boot_time()
+    uptime_sec = time.time() - boot_time
+
+    # 2. CPU & RAM
+    cpu_percent = psutil.cpu_percent(interval=None) # 非阻塞
+    mem = psutil.virtual_memory()
+
+    # 3. Network
+    net = psutil.net_io_counters()
+
+    # 4. GPU Info & Process Mapping (慢节奏采样, 见 _collect_gpus)
+    if HAS_GPU:
+        gpu_list, gpu_processes_map = _collect_gpus()
+    else:
+        gpu_list, gpu_processes_map = [], {}
 
     # 5. Process List (Top active)
     active_processes = []
     try:
-        # 获取所有进程的迭代器
-        for proc in psutil.process_iter(['pid', 'name', 'username', 'cmdline', 'cpu_percent', 'memory_percent']):
-            # print(proc.info)
-            try:
-                p_info = proc.info
-                pid = p_info['pid']
-                
-                # 判断是否是 GPU 进程
-                is_gpu_proc = pid in gpu_processes_map
-                
-                # 过滤策略: 显示所有 GPU 进程，或者 CPU > 2.0% 的进程
-                if is_gpu_proc or (p_info['cpu_percent'] or 0) > 2.0:
-                    # print(p_info)
-                    
-                    cmd_str = p_info['name']
-                    if p_info['cmdline']:
-                        cmd_str = " ".join(p_info['cmdline'][:3]) # 取命令行前3个部分
-                        if len(cmd_str) > 60:
-                            cmd_str = cmd_str[:57] + "..."
-                    
-                    gpu_idx = None
-                    vram_mb = None
-                    
-                    if is_gpu_proc:
-                        gpu_data = gpu_processes_map[pid]
-                        gpu_idx = gpu_data['gpu_idx']
-                        vram_mb = gpu_data['vram_mb']
-
-                    active_processes.append(ProcessInfo(
-                        pid=pid,
-                        user=p_info['username'] or "system",
-                        command=cmd_str,
-                        cpu_percent=p_info['cpu_percent'] or 0.0,
-                        memory_percent=round(p_info['memory_percent'] or 0.0, 1),
-                        gpu_index=gpu_idx,
-                        vram_used_mb=vram_mb
-                    ))
-            except (psutil.NoSuchProcess, psutil.AccessDenied, psutil.ZombieProcess):
-                pass
+        # Linux 直接扫 /proc, 其他平台回退 psutil (单进程错误在迭代器内部消化)
+        proc_iter = _linux_fast_proc_iter() if IS_LINUX else _psutil_proc_iter()
+        for p_info in proc_iter:
+            pid = p_info['pid']
+
+            # 判断是否是 GPU 进程
+            is_gpu_proc = pid in gpu_processes_map
+
+            # 过滤策略: 显示所有 GPU 进程，或者 CPU > 2.0% 的进程
+            if is_gpu_proc or (p_info['cpu_percent'] or 0) > 2.0:
+                cmd_str = p_info['name']
+                if p_info['cmdline']:
+                    # 取命令行前3个部分, 累积到 60 字符就提前停, 省掉中间字符串
+                    buf = []
+                    n = 0
+                    for part in p_info['cmdline'][:3]:
+                        buf.append(part)
+                        n += len(part) + 1
+                        if n > 60:
+                            break
+                    cmd_str = " ".join(buf)
+                    if len(cmd_str) > 60:
+                        cmd_str = cmd_str[:57] + "..."
+
+                gpu_idx = None
+                vram_mb = None
+                gpu_util = None
+
+                if is_gpu_proc:
+                    gpu_data = gpu_processes_map[pid]
+                    gpu_idx = gpu_data['gpu_idx']
+                    vram_mb = gpu_data['vram_mb']
+                    gpu_util = gpu_data.get('gpu_util')
+
+                # 先收集轻量元组, Top-10 选出后再构造 Pydantic 模型
+                # 排序键放首位, 堆比较走 C 层元组比较, 无需 key 回调
+                # (pid 作为决胜项, 保证永远比较不到含 None 的数据部分)
+                cpu = p_info['cpu_percent'] or 0.0
+                active_processes.append((
+                    (gpu_idx is None, -cpu, pid),
+                    (
+                        pid,
+                        p_info['username'] or "system",
+                        cmd_str,
+                        cpu,
+                        round(p_info['memory_percent'] or 0.0, 1),
+                        gpu_idx,
+                        vram_mb,
+                        gpu_util
+                    )
+                ))
     except Exception:
         pass
 
     # 排序：优先 GPU 进程，然后按 CPU 降序，限制返回数量防止 JSON 过大
-    active_processes.sort(key=lambda x: (x.gpu_index is None, x.cpu_percent * -1))
-    active_processes = active_processes[:10]
+    # 用堆取 Top-10, O(N log K) 且不用构造完整排序列表
+    top = heapq.nsmallest(10, active_processes)
+    # 只为最终返回的 10 条构造 ProcessInfo (Pydantic 校验开销只付一次)
+    processes = [
+        ProcessInfo.model_construct(pid=pid, user=user, command=cmd, cpu_percent=cpu,
+                    memory_percent=mem_pct, gpu_index=g_idx, vram_used_mb=vram,
+                    gpu_utilization=g_util)
+        for _, (pid, user, cmd, cpu, mem_pct, g_idx, vram, g_util) in top
+    ]
 
-    return SystemMetrics(
-        hostname=platform.node(),
-        ip_address=get_ip_address(),
-        os=f"{platform.system()} {platform.release()}",
+    return SystemMetrics.model_construct(
+        hostname=HOSTNAME,
+        ip_address=_get_ip_cached(),
+        os=OS_STRING,
         uptime_seconds=uptime_sec,
         uptime_human=format_uptime(uptime_sec),
-        cpu_model=get_cpu_model(),
+        cpu_model=CPU_MODEL,
         cpu_usage=cpu_percent,
-        cpu_cores=cpu_cores,
+        cpu_cores=CPU_CORES,
         ram_total=round(mem.total / 1024**3, 1),
         ram_used=round(mem.used / 1024**3, 1),
         ram_percent=mem.percent,
         net_sent_mb=round(net.bytes_sent / 1024**2, 2),
         net_recv_mb=round(net.bytes_recv / 1024**2, 2),
         gpus=gpu_list,
-        processes=active_processes
+        processes=processes
     )
 
+# --- 后台采样线程 (采样频率与客户端数量解耦, 多客户端轮询不会放大驱动负载) ---
+POLL_INTERVAL = float(os.getenv("AGENT_POLL_INTERVAL", "2"))
+# 每个 tick 序列化一次, 请求路径零校验零序列化, 只发字节
+_LATEST_JSON: Optional[bytes] = None
+
+def _dump_metrics(metrics: SystemMetrics) -> bytes:
+    return metrics.model_dump_json().encode("utf-8")
+
+def _sampler_loop():
+    global _LATEST_JSON
+    while True:
+        try:
+            # 整体替换引用即原子操作, 读侧无需加锁
+            _LATEST_JSON = _dump_metrics(_collect_sync())
+        except Exception as e:
+            print(f"Error in sampler loop: {e}")
+        time.sleep(POLL_INTERVAL)
+
+# response_model=None: 避免 FastAPI 对每次请求重新校验整个快照;
+# 文档里的 schema 通过 responses 保留
+@app.get("/metrics", response_model=None,
+         responses={200: {"model": SystemMetrics}})
+async def get_metrics():
+    # 直接返回后台线程预序列化的最新快照
+    body = _LATEST_JSON
+    if body is None:
+        # 采样线程尚未完成首轮 (启动竞态), 退化为现场采集一次
+        body = _dump_metrics(await run_in_threadpool(_collect_sync))
+    return Response(content=body, media_type="application/json")
+
 if __name__ == "__main__":
     uvicorn.run(app, host="0.0.0.0", port=8005)
\ No newline at end of file
@@ -1,8 +1,10 @@
 import http.server
-import socketserver
+from http.server import ThreadingHTTPServer
 import json
 import os
 import sys
+import time
+import threading
 import urllib.request
 import urllib.error
 from urllib.parse import urlparse, parse_qs
@@ -12,18 +14,47 @@ from datetime import datetime
 PORT = 3000
 CONFIG_FILE = 'config.json'
 
+# 连接池: 复用到 Agent 的 TCP 连接, 省掉每次轮询的握手开销
+# (FRP 隧道下延迟高, 握手成本加倍; 未安装 urllib3 则退回标准库, 功能不变)
+try:
+    import urllib3
+    # retries=False: 默认的 Retry(3) 会把挂掉的 Agent 拖成 ~12 秒才报 502
+    POOL = urllib3.PoolManager(num_pools=16, maxsize=32,
+                               timeout=urllib3.Timeout(total=3.0),
+                               retries=False)
+except ImportError:
+    POOL = None
+
+# /api/proxy 短 TTL 缓存: 多个浏览器/标签页轮询同一 Agent 时合并为一次上游请求
+PROXY_CACHE = {}  # url -> (monotonic_ts, status, content_type, body)
+PROXY_CACHE_LOCK = threading.Lock()
+PROXY_CACHE_TTL = 1.0  # 秒, 可用 ?max_age= 按请求覆盖
+PROXY_CACHE_MAX_ENTRIES = 256  # url 是外部可控参数, 必须限制缓存总量
+
 class ConfigHandler(http.server.SimpleHTTPRequestHandler):
     def do_GET(self):
         # 1. 获取配置接口
         if self.path == '/api/config':
-            self.send_response(200)
-            self.send_header('Content-type', 'application/json')
-            self.end_headers()
-            
             if os.path.exists(CONFIG_FILE):
+                # mtime+size 做 ETag: 配置没变时回 304, 省掉磁盘读和响应体传输
+                st = os.stat(CONFIG_FILE)
+                etag = f'W/"{int(st.st_mtime)}-{st.st_size}"'
+                if self.headers.get('If-None-Match') == etag:
+                    self.send_response(304)
+                    self.send_header('ETag', etag)
+                    self.end_headers()
+                    return
+
+                self.send_response(200)
+                self.send_header('Content-type', 'application/json')
+                self.send_header('ETag', etag)
+                self.end_headers()
                 with open(CONFIG_FILE, 'r', encoding='utf-8') as f:
                     self.wfile.write(f.read().encode('utf-8'))
             else:
+                self.send_response(200)
+                self.send_header('Content-type', 'application/json')
+                self.end_headers()
                 self.wfile.write(b'[]')
             return
 
@@ -37,15 +68,65 @@ class ConfigHandler(http.server.SimpleHTTPRequestHandler):
                 if not target_url:
                     raise ValueError("Missing 'url' parameter")
 
-                # 设置 3 秒超时，防止内网不通导致卡死
-                with urllib.request.urlopen(target_url, timeout=3) as response:
-                    self.send_response(response.status)
-                    # 转发 Content-Type (application/json)
-                    content_type = response.getheader('Content-Type')
+                try:
+                    max_age = float(query.get('max_age', [PROXY_CACHE_TTL])[0])
+                except (TypeError, ValueError):
+                    max_age = PROXY_CACHE_TTL
+
+                # 命中缓存直接返回, 不再打上游
+                cached = PROXY_CACHE.get(target_url)
+                if cached and time.monotonic() - cached[0] < max_age:
+                    _, status, content_type, body = cached
+                    self.send_response(status)
+                    if content_type:
+                        self.send_header('Content-type', content_type)
+                    self.end_headers()
+                    self.wfile.write(body)
+                    return
+
+                # 流式转发: 边收边发, 降低首字节延迟和峰值内存
+                # (同时把分块攒起来喂给缓存, 不影响上面的命中路径)
+                chunks = []
+                if POOL is not None:
+                    # 走连接池, keepalive 复用连接
+                    r = POOL.request('GET', target_url, preload_content=False)
+                    status = r.status
+                    content_type = r.headers.get('Content-Type')
+                    self.send_response(status)
                     if content_type:
                         self.send_header('Content-type', content_type)
                     self.end_headers()
-                    self.wfile.write(response.read())
+                    for chunk in r.stream(16384):
+                        self.wfile.write(chunk)
+                        chunks.append(chunk)
+                    r.release_conn()
+                else:
+                    # 回退: 标准库, 每次新建连接; 3 秒超时防止内网不通导致卡死
+                    with urllib.request.urlopen(target_url, timeout=3) as response:
+                        status = response.status
+                        # 转发 Content-Type (application/json)
+                        content_type = response.getheader('Content-Type')
+                        self.send_response(status)
+                        if content_type:
+                            self.send_header('Content-type', content_type)
+                        self.end_headers()
+                        while True:
+                            chunk = response.read(16384)
+                            if not chunk:
+                                break
+                            self.wfile.write(chunk)
+                            chunks.append(chunk)
+
+                with PROXY_CACHE_LOCK:
+                    now = time.monotonic()
+                    # 插入时顺手清理: 过期条目 (60 秒足够覆盖任何合理 max_age) + 总量上限
+                    for u in [u for u, c in PROXY_CACHE.items() if now - c[0] > 60]:
+                        del PROXY_CACHE[u]
+                    if len(PROXY_CACHE) >= PROXY_CACHE_MAX_ENTRIES:
+                        oldest = min(PROXY_CACHE, key=lambda u: PROXY_CACHE[u][0])
+                        del PROXY_CACHE[oldest]
+                    PROXY_CACHE[target_url] = (now, status, content_type,
+                                               b"".join(chunks))
             except Exception as e:
                 # 代理失败返回 502 Bad Gateway
                 self.send_response(502)
@@ -95,12 +176,13 @@ class ConfigHandler(http.server.SimpleHTTPRequestHandler):
             return
 
 # 允许地址重用，防止重启时报端口占用
-socketserver.TCPServer.allow_reuse_address = True
+ThreadingHTTPServer.allow_reuse_address = True
 
 print(f"🚀 Nexus Gateway running at http://0.0.0.0:{PORT}")
 print(f"📂 Configuration will be saved to: {os.path.abspath(CONFIG_FILE)}")
 
-with socketserver.TCPServer(("", PORT), ConfigHandler) as httpd:
+# 多线程服务: 慢的 /api/proxy (最长 3 秒超时) 不再阻塞静态文件请求
+with ThreadingHTTPServer(("", PORT), ConfigHandler) as httpd:
     try:
         httpd.serve_forever()
     except KeyboardInterrupt: